@@ -1,141 +1,351 @@
 # uvicorn main:app --reload
-import time
+import hashlib
+import logging
+import math
+import threading
+from bisect import bisect_right
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from html import escape
 from pathlib import Path
 from fastapi import FastAPI, Request, Query
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import numpy as np
-import matplotlib
-
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-# Set the backend to 'Agg' before importing pyplot
+import orjson
 
 import os
-import pandas as pd
-from typing import Optional
+from typing import NamedTuple, Optional
+
+# Per-request diagnostics are logged at DEBUG; production runs at WARNING and
+# skips formatting them entirely.
+logger = logging.getLogger(__name__)
 
 # --- IAPWS LIBRARY IMPORT ---
 try:
     from iapws import IAPWS97
 
     IAPWS_AVAILABLE = True
-    print("✅ IAPWS library loaded successfully.")
+    logger.info("IAPWS library loaded successfully.")
 except ImportError:
     IAPWS_AVAILABLE = False
-    print("⚠️ IAPWS library not available. Falling back to CSV interpolation.")
+    logger.warning("IAPWS library not available. Falling back to CSV interpolation.")
+
+# Private IF97 region equations behind IAPWS97, used to evaluate both saturated
+# phases in one pass. A release without them only loses that shortcut.
+try:
+    from iapws.iapws97 import _PSat_T, _Region1, _Region2, _Region3, _Backward3_sat_v_P
+
+    IAPWS_REGIONS_AVAILABLE = True
+except ImportError:
+    IAPWS_REGIONS_AVAILABLE = False
+    if IAPWS_AVAILABLE:
+        logger.info("IAPWS region equations not available. Saturation states will use IAPWS97.")
+
+# --- NUMBA JIT (optional) ---
+try:
+    from numba import njit
+
+    logger.info("Numba loaded successfully. Numeric kernels will be JIT-compiled.")
+except ImportError:
+    logger.info("Numba not available. Numeric kernels will run as plain Python.")
+
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that leaves the function as plain Python."""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# --- SEUIF97 (optional) ---
+try:
+    import seuif97
+
+    SEUIF97_AVAILABLE = True
+    logger.info("SEUIF97 loaded successfully. Saturation domes will use compiled IF97.")
+except ImportError:
+    SEUIF97_AVAILABLE = False
+    logger.info("SEUIF97 not available. Saturation domes will use the CSV table.")
 
 # --- WATER DATA SETUP ---
 # Load CSV (Ensure static/saturated_water.csv exists)
 water_csv_path = Path("static/saturated_water.csv")
+# Parsed columns are cached next to the CSV so other workers and restarts skip the parse
+water_cache_path = water_csv_path.with_suffix(".npz")
+
+
+def _load_water_table():
+    """
+    Returns the CSV as {column: float64 array}, reading the .npz cache when it is
+    at least as new as the CSV and rebuilding it otherwise.
+    """
+    csv_mtime = water_csv_path.stat().st_mtime
+    if water_cache_path.exists() and water_cache_path.stat().st_mtime >= csv_mtime:
+        try:
+            with np.load(water_cache_path) as cached:
+                return {name: cached[name] for name in cached.files}
+        except Exception as e:
+            logger.warning("Ignoring unreadable water table cache: %s", e)
+
+    # Plain float64 columns; anything non-numeric becomes NaN
+    table = np.genfromtxt(water_csv_path, delimiter=",", names=True, dtype=np.float64)
+    cols = {name: table[name].copy() for name in table.dtype.names}
+
+    # Write to a temp file first so a concurrent worker never reads a partial cache
+    tmp_path = water_cache_path.with_name(f"{water_cache_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **cols)
+        os.replace(tmp_path, water_cache_path)
+    except OSError as e:
+        tmp_path.unlink(missing_ok=True)
+        logger.warning("Could not write water table cache: %s", e)
+    return cols
+
+
 try:
-    water_df = pd.read_csv(water_csv_path)
-    # Ensure numeric
-    for col in water_df.columns:
-        water_df[col] = pd.to_numeric(water_df[col], errors='coerce')
-    print("✅ Water properties CSV loaded successfully.")
+    water_cols = _load_water_table()
+    logger.info("Water properties CSV loaded successfully.")
 except FileNotFoundError:
-    print("❌ ERROR: 'static/saturated_water.csv' not found. Water simulation will fail.")
-    water_df = pd.DataFrame()
+    logger.error("'static/saturated_water.csv' not found. Water simulation will fail.")
+    water_cols = {}
+
+
+# Saturation properties returned together by saturation_props_by_T, in this order
+SAT_PROPS = ("vf", "vg", "uf", "ug", "hf", "hfg", "sf", "sg", "P_bar")
+
+# --- SATURATION TABLE ARRAYS ---
+# The CSV never changes after load, so sort it once by each lookup key here and
+# keep the columns as contiguous float64 arrays. No request sorts or filters it.
+if water_cols:
+    _order_T = np.argsort(water_cols["T_sat"])
+    _props_by_T = {col: vals[_order_T] for col, vals in water_cols.items()}
+    _T_sorted = _props_by_T["T_sat"]
+
+    _order_P = np.argsort(water_cols["P_bar"])
+    _P_sorted = water_cols["P_bar"][_order_P]
+    _T_by_P = water_cols["T_sat"][_order_P]
+
+    # One row per table entry, columns in SAT_PROPS order, so a lookup reads
+    # two contiguous rows of nine doubles instead of nine separate columns.
+    _PROP_MATRIX = np.ascontiguousarray(np.column_stack([_props_by_T[c] for c in SAT_PROPS]))
+
+    # (v, u, h, s, P_bar) of saturated liquid and of saturated vapor, with
+    # hg = hf + hfg folded in, for states known to be exactly x = 0 or x = 1
+    _LIQUID_MATRIX = np.column_stack([_props_by_T[c] for c in ("vf", "uf", "hf", "sf", "P_bar")])
+    _VAPOR_MATRIX = np.column_stack([_props_by_T["vg"], _props_by_T["ug"],
+                                     _props_by_T["hf"] + _props_by_T["hfg"],
+                                     _props_by_T["sg"], _props_by_T["P_bar"]])
+else:
+    _T_sorted = _P_sorted = _T_by_P = np.empty(0, dtype=np.float64)
+    _props_by_T = {}
+    _PROP_MATRIX = np.empty((0, len(SAT_PROPS)), dtype=np.float64)
+    _LIQUID_MATRIX = _VAPOR_MATRIX = np.empty((0, 5), dtype=np.float64)
+
+# Plain-list copies for scalar lookups: bisect on a list avoids NumPy's
+# per-call array wrapping, which dominates when only one value is needed.
+_T_list = _T_sorted.tolist()
+_prop_lists = {col: arr.tolist() for col, arr in _props_by_T.items()}
+_P_list = _P_sorted.tolist()
+_T_by_P_list = _T_by_P.tolist()
+
+
+# --- NUMERIC KERNELS ---
+# Only the kernels that measurably beat plain Python are compiled with Numba;
+# for one-line scalar helpers its call overhead outweighs the arithmetic.
+# cache=True keeps the compiled code on disk across restarts.
+def _lerp(x, x1, x2, y1, y2):
+    """Linear interpolation between (x1, y1) and (x2, y2)."""
+    return y1 + (y2 - y1) * (x - x1) / (x2 - x1)
+
+
+@njit(cache=True, fastmath=True)
+def _blend_rows(lower, upper, w):
+    """Interpolates between two rows of _PROP_MATRIX with weight w towards upper."""
+    return lower + (upper - lower) * w
+
+
+def _ideal_gas_state(P, v, R, cv, cp):
+    """Returns (T, u, h) of an ideal gas from P (kPa), v (m³/kg) and its constants."""
+    T = P * v / R
+    return T, cv * T, cp * T
+
+
+# Integer codes for _solve_ideal_gas_process, keyed by PROCESS_MAP's process types
+_PROCESS_CODES = {"isothermal": 0, "polytropic": 1, "adiabatic": 2, "isochoric": 3, "isobaric": 4}
+
+
+@njit(cache=True)  # no fastmath: the isochoric exponent is infinite
+def _solve_ideal_gas_process(process_code, T1, P1, v1, v_ratio, p_ratio, k, cv, cp, R, n):
+    """
+    Solves an ideal-gas process from State 1 and the process ratios.
+    Returns (T2, P2, v2, u1, u2, h1, h2, W, Q, s1, s2, exponent).
+    """
+    v2 = v1 * v_ratio
+    if process_code == 0:  # isothermal
+        exponent = 1.0
+        P2 = P1 * (v1 / v2)
+        T2 = T1
+    elif process_code == 1 or process_code == 2:  # polytropic, adiabatic
+        exponent = n if process_code == 1 else k
+        P2 = P1 * (v1 / v2) ** exponent
+        T2 = T1 * (v1 / v2) ** (exponent - 1)
+    elif process_code == 3:  # isochoric
+        exponent = math.inf
+        P2 = P1 * p_ratio
+        T2 = T1 * p_ratio
+        v2 = v1
+    else:  # isobaric
+        exponent = 0.0
+        T2 = T1 * v_ratio
+        P2 = P1
+
+    u1, u2 = cv * T1, cv * T2
+    h1, h2 = cp * T1, cp * T2
+
+    if process_code == 3:
+        W = 0.0
+    elif process_code == 4:
+        W = P1 * (v2 - v1)
+    elif abs(exponent - 1.0) <= 1.001e-5:  # isothermal, or n close enough to 1
+        W = R * T1 * math.log(v2 / v1)
+    else:
+        W = (P2 * v2 - P1 * v1) / (1 - exponent)
+
+    Q = (u2 - u1) + W
+    # Logs are computed inline: a memoized lookup costs more than the log itself
+    s1 = cp * math.log(T1) - R * math.log(P1)
+    s2 = s1 + cp * math.log(T2 / T1) - R * math.log(P2 / P1)
+    return T2, P2, v2, u1, u2, h1, h2, W, Q, s1, s2, exponent
 
 
 # --- INTERPOLATION HELPERS (Confirmed to be correct) ---
-def interpolate_water_property_by_T(T_C, prop_name):
+# Last bracketing index found by each lookup. Slider-driven queries usually land
+# within a row of the previous one, so these are tried before bisecting.
+_last_idx_T = [1]
+_last_idx_P = [1]
+_last_idx_psat = [1]
+
+
+def _search_with_guess(xs, x, last):
     """
-    Interpolates a water property from the CSV by saturation temperature (T_sat in °C).
-    If T_C is outside the table, returns the nearest boundary value.
+    Returns i such that xs[i - 1] <= x <= xs[i] for an x already clamped to xs.
+    Checks last[0] and its neighbours first and only bisects if all of them miss.
+    The guess is always verified, so a stale value from another thread is harmless.
     """
-    df = water_df
-    if df.empty: return None
+    g = last[0]
+    for i in (g, g + 1, g - 1):
+        if 1 <= i < len(xs) and xs[i - 1] <= x <= xs[i]:
+            break
+    else:
+        i = min(max(bisect_right(xs, x), 1), len(xs) - 1)
 
-    T_min, T_max = df["T_sat"].min(), df["T_sat"].max()
+    last[0] = i
+    return i
 
-    # Clamp T_C to CSV bounds
-    if T_C < T_min:
-        T_C = T_min
-    elif T_C > T_max:
-        T_C = T_max
 
-    # Find closest lower and upper rows
-    lower = df[df["T_sat"] <= T_C].iloc[-1]
-    upper = df[df["T_sat"] >= T_C].iloc[0]
+def _interp_scalar(x, xs, ys, last):
+    """
+    Linearly interpolates ys over the sorted list xs at a single point x.
+    x is clamped to the table first, so the end values are held outside it.
+    """
+    x = min(max(x, xs[0]), xs[-1])
+    i = _search_with_guess(xs, x, last)
 
-    if lower["T_sat"] == upper["T_sat"]:
-        return lower[prop_name]
+    return _lerp(x, xs[i - 1], xs[i], ys[i - 1], ys[i])
 
-    # Linear interpolation
-    T1, T2 = lower["T_sat"], upper["T_sat"]
-    val1, val2 = lower[prop_name], upper[prop_name]
-    return val1 + (val2 - val1) * (T_C - T1) / (T2 - T1)
 
+def _interp_matrix(M, T_C):
+    """Interpolates every column of a T_sat-sorted table matrix at T_C with a single search."""
+    T_C = min(max(T_C, _T_list[0]), _T_list[-1])
+    i = _search_with_guess(_T_list, T_C, _last_idx_T)
 
-def get_tsat(P: float):
+    T1, T2 = _T_list[i - 1], _T_list[i]
+    w = (T_C - T1) / (T2 - T1)
+    return tuple(_blend_rows(M[i - 1], M[i], w).tolist())
+
+
+@lru_cache(maxsize=2048)
+def _saturation_props_at(T_C):
+    """Interpolates all SAT_PROPS at one (already rounded) temperature."""
+    return _interp_matrix(_PROP_MATRIX, T_C)
+
+
+@lru_cache(maxsize=2048)
+def _liquid_props_at(T_C):
+    return _interp_matrix(_LIQUID_MATRIX, T_C)
+
+
+@lru_cache(maxsize=2048)
+def _vapor_props_at(T_C):
+    return _interp_matrix(_VAPOR_MATRIX, T_C)
+
+
+def _pure_liquid_props(T_C):
+    """Returns (v, u, h, s, P_sat) of saturated liquid at T_C (°C), without the vapor columns."""
+    if not _T_list: return None
+
+    return _liquid_props_at(round(float(T_C), 4))
+
+
+def _pure_vapor_props(T_C):
+    """Returns (v, u, h, s, P_sat) of saturated vapor at T_C (°C), without the liquid columns."""
+    if not _T_list: return None
+
+    return _vapor_props_at(round(float(T_C), 4))
+
+
+def saturation_props_by_T(T_C):
     """
-    Returns saturation temperature in °C for a given P (bar) using linear interpolation.
-    Clamps P to CSV range if outside bounds.
+    Returns (vf, vg, uf, ug, hf, hfg, sf, sg, P_bar) at saturation temperature T_C (°C).
+    Results are memoized on T rounded to 1e-4 °C; the table never changes after load.
     """
-    if water_df.empty: return None, False
+    if not _T_list: return None
 
-    df_sorted = water_df.sort_values("P_bar")
-    P_min, P_max = df_sorted["P_bar"].min(), df_sorted["P_bar"].max()
-    clamped = False
+    return _saturation_props_at(round(float(T_C), 4))
 
-    # Clamp P to CSV range
-    if P < P_min:
-        P = P_min
-        clamped = True
-    elif P > P_max:
-        P = P_max
-        clamped = True
 
-    lower = df_sorted[df_sorted["P_bar"] <= P].iloc[-1]
-    upper = df_sorted[df_sorted["P_bar"] >= P].iloc[0]
+@lru_cache(maxsize=4096)
+def get_tsat(P: float):
+    """
+    Returns saturation temperature in °C for a given P (bar) using linear interpolation.
+    Clamps P to CSV range if outside bounds.
+    """
+    if not _P_list: return None, False
 
-    if lower["P_bar"] == upper["P_bar"]:
-        Tsat = lower["T_sat"]
-    else:
-        P1, P2 = lower["P_bar"], upper["P_bar"]
-        T1, T2 = lower["T_sat"], upper["T_sat"]
-        Tsat = T1 + (T2 - T1) * (P - P1) / (P2 - P1)
+    clamped = P < _P_list[0] or P > _P_list[-1]
+    Tsat = _interp_scalar(P, _P_list, _T_by_P_list, _last_idx_P)
 
     return round(Tsat, 5), clamped
 
 
+@lru_cache(maxsize=4096)
 def get_psat(T_C: float):
     """
     Returns saturation pressure in bar for a given T (°C) using linear interpolation.
     Clamps T to CSV range if outside bounds.
     """
-    if water_df.empty:
+    if not _T_list:
         return None, False
 
-    df_sorted = water_df.sort_values("T_sat")
-    T_min, T_max = df_sorted["T_sat"].min(), df_sorted["T_sat"].max()
-    clamped = False
-
-    # Clamp T to CSV range
-    if T_C < T_min:
-        T_C = T_min
-        clamped = True
-    elif T_C > T_max:
-        T_C = T_max
-        clamped = True
-
-    lower = df_sorted[df_sorted["T_sat"] <= T_C].iloc[-1]
-    upper = df_sorted[df_sorted["T_sat"] >= T_C].iloc[0]
-
-    if lower["T_sat"] == upper["T_sat"]:
-        Psat = lower["P_bar"]
-    else:
-        T1, T2 = lower["T_sat"], upper["T_sat"]
-        P1, P2 = lower["P_bar"], upper["P_bar"]
-        Psat = P1 + (P2 - P1) * (T_C - T1) / (T2 - T1)
+    clamped = T_C < _T_list[0] or T_C > _T_list[-1]
+    Psat = _interp_scalar(T_C, _T_list, _prop_lists["P_bar"], _last_idx_psat)
 
     return round(Psat, 5), clamped
 
 
 # --- IAPWS CALCULATION FUNCTION ---
+# IAPWS-IF97 validity envelope; states outside it never reach IAPWS97
+_IAPWS_T_RANGE = (273.15, 1073.15)  # K, regions 1-3
+_IAPWS_P_RANGE_MPA = (0.0, 100.0)  # MPa
+_IAPWS_T_MAX_REGION5 = 2273.15  # K, region 5 extends the range up to 50 MPa
+_IAPWS_P_MAX_REGION5_MPA = 50.0  # MPa
+_IAPWS_T_CRIT = 647.096  # K, the saturation line ends at the critical point
+_IAPWS_T_REGION3 = 623.15  # K, above this the saturated states lie in region 3
+
+
 def calculate_water_properties_iapws(T_C, P_bar, x):
     """
     Calculate water properties using IAPWS-IF97 (Industrial Formulation 1997).
@@ -144,40 +354,80 @@ def calculate_water_properties_iapws(T_C, P_bar, x):
     if not IAPWS_AVAILABLE:
         return None
 
+    result = _calculate_water_properties_iapws(T_C, P_bar, x)
+    # Callers adjust the returned dict, so never hand out the cached instance
+    return dict(result) if result else None
+
+
+@lru_cache(maxsize=1024)
+def _iapws_saturation(T_K):
+    """
+    Returns (vf, vg, uf, ug, hf, hg, sf, sg, P_sat in bar) at T_K (K), or None above the
+    critical point. Only depends on T, so it is cached apart from the full state.
+    """
+    if not _IAPWS_T_RANGE[0] <= T_K <= _IAPWS_T_CRIT:
+        return None
+
+    if not IAPWS_REGIONS_AVAILABLE:
+        sat_liquid = IAPWS97(T=T_K, x=0.0)
+        sat_vapor = IAPWS97(T=T_K, x=1.0)
+        return (sat_liquid.v, sat_vapor.v, sat_liquid.u, sat_vapor.u,
+                sat_liquid.h, sat_vapor.h, sat_liquid.s, sat_vapor.s,
+                sat_liquid.P * 10)  # Convert MPa to bar
+
+    # Same equations IAPWS97(T=T_K, x=0/1) would use, but the saturation pressure
+    # is solved once and each phase is evaluated once instead of per object
+    P_sat = _PSat_T(T_K)
+    if T_K > _IAPWS_T_REGION3:
+        liq = _Region3(1. / _Backward3_sat_v_P(P_sat, T_K, 0), T_K)
+        vap = _Region3(1. / _Backward3_sat_v_P(P_sat, T_K, 1), T_K)
+    else:
+        liq = _Region1(T_K, P_sat)
+        vap = _Region2(T_K, P_sat)
+
+    # u = h - Pv, with P in MPa -> kPa
+    uf = liq["h"] - liq["P"] * 1000 * liq["v"]
+    ug = vap["h"] - vap["P"] * 1000 * vap["v"]
+    return (liq["v"], vap["v"], uf, ug,
+            liq["h"], vap["h"], liq["s"], vap["s"],
+            liq["P"] * 10)  # Convert MPa to bar
+
+
+@lru_cache(maxsize=1024)
+def _calculate_water_properties_iapws(T_C, P_bar, x):
+    """Memoized IAPWS97 evaluation; constructing IAPWS97 objects is the dominant per-request cost."""
     try:
         # IAPWS uses MPa for pressure and Kelvin for temperature
         P_MPa = P_bar * 0.1  # Convert bar to MPa
         T_K = T_C + 273.15  # Convert °C to K
 
+        if not _IAPWS_T_RANGE[0] <= T_K <= _IAPWS_T_MAX_REGION5:
+            return None
+        if T_K > _IAPWS_T_RANGE[1] and P_MPa > _IAPWS_P_MAX_REGION5_MPA:
+            return None
+
         # Determine if we should use temperature-pressure or temperature-quality
         # For superheated/subcooled, use T and P
         # For two-phase, use T and x
 
         if 0 < x < 1:
             # Two-phase region - use quality
+            if T_K > _IAPWS_T_CRIT:
+                return None
             water = IAPWS97(T=T_K, x=x)
         else:
             # Single phase - use pressure and temperature
+            if not _IAPWS_P_RANGE_MPA[0] < P_MPa <= _IAPWS_P_RANGE_MPA[1]:
+                return None
             water = IAPWS97(T=T_K, P=P_MPa)
 
         # Get saturation properties at this temperature for reference
-        try:
-            sat_liquid = IAPWS97(T=T_K, x=0.0)
-            sat_vapor = IAPWS97(T=T_K, x=1.0)
-
-            vf = sat_liquid.v
-            vg = sat_vapor.v
-            uf = sat_liquid.u
-            ug = sat_vapor.u
-            hf = sat_liquid.h
-            hg = sat_vapor.h
-            sf = sat_liquid.s
-            sg = sat_vapor.s
+        sat = _iapws_saturation(round(T_K, 2))
+        if sat:
+            vf, vg, uf, ug, hf, hg, sf, sg, P_sat_at_T = sat
             hfg = hg - hf
-            # Get saturation pressure at this temperature
-            P_sat_at_T = sat_liquid.P * 10  # Convert MPa to bar
-        except:
-            # Fallback if saturation properties fail
+        else:
+            # No saturation line above the critical point
             vf = vg = uf = ug = hf = hg = sf = sg = hfg = 0
             P_sat_at_T = P_bar
 
@@ -220,20 +470,26 @@ def calculate_water_properties_iapws(T_C, P_bar, x):
         }
 
     except Exception as e:
-        print(f"❌ IAPWS calculation failed for T={T_C}°C, P={P_bar}bar, x={x}: {str(e)}")
+        logger.warning("IAPWS calculation failed for T=%s°C, P=%sbar, x=%s: %s", T_C, P_bar, x, e)
         return None
 
 
 # --- PROPERTY CALCULATION FOR WATER (Updated Version with IAPWS) ---
-def calculate_water_properties(T_C, P_bar, x):
+def calculate_water_properties(T_C, P_bar, x, *, T_sat_at_P=None, P_sat_at_T=None,
+                               saturation_detail=True):
     """
     Calculates water properties based on temperature, pressure, and quality.
     Uses IAPWS for accurate superheated/subcooled calculations when available.
+    Callers that already know T_sat at P_bar or P_sat at T_C can pass them to skip the lookups.
+    With saturation_detail=False, CSV results for x = 0 or 1 omit vf..sg and only
+    interpolate the columns of that phase.
     """
     # Get saturation temperature at this pressure
-    T_sat_at_P, _ = get_tsat(P_bar)
+    if T_sat_at_P is None:
+        T_sat_at_P, _ = get_tsat(P_bar)
     # Get saturation pressure at this temperature
-    P_sat_at_T, _ = get_psat(T_C)
+    if P_sat_at_T is None:
+        P_sat_at_T, _ = get_psat(T_C)
 
     # Determine phase
     is_superheated = T_sat_at_P and T_C > T_sat_at_P
@@ -256,20 +512,32 @@ def calculate_water_properties(T_C, P_bar, x):
             return iapws_result
 
     # Fallback to CSV interpolation for saturated states or if IAPWS fails
+    # Pure liquid or vapor: v, u, h, s come straight from one phase's columns
+    if not saturation_detail and x in (0.0, 1.0):
+        phase_props = _pure_vapor_props(T_C) if x == 1.0 else _pure_liquid_props(T_C)
+        if phase_props is None:
+            raise ValueError("Required water property data could not be interpolated.")
+
+        v, u, h, s, P_sat_at_T_csv = phase_props
+        return {
+            "T": T_C,  # °C
+            "P": P_sat_at_T_csv,  # bar
+            "P_sat": P_sat_at_T_csv,  # Saturation pressure at T
+            "x": x,
+            "v": v,  # m³/kg
+            "u": u,  # kJ/kg
+            "h": h,  # kJ/kg
+            "s": s,  # kJ/(kg·K)
+            "source": "CSV Interpolation"
+        }
+
     # Get saturation properties at the given temperature
-    vf = interpolate_water_property_by_T(T_C, "vf")
-    vg = interpolate_water_property_by_T(T_C, "vg")
-    uf = interpolate_water_property_by_T(T_C, "uf")
-    ug = interpolate_water_property_by_T(T_C, "ug")
-    hf = interpolate_water_property_by_T(T_C, "hf")
-    hfg = interpolate_water_property_by_T(T_C, "hfg")
-    sf = interpolate_water_property_by_T(T_C, "sf")
-    sg = interpolate_water_property_by_T(T_C, "sg")
-    P_sat_at_T_csv = interpolate_water_property_by_T(T_C, "P_bar")
-
-    if None in [vf, vg, uf, ug, hf, hfg, sf, sg, P_sat_at_T_csv]:
+    sat_props = saturation_props_by_T(T_C)
+    if sat_props is None:
         raise ValueError("Required water property data could not be interpolated.")
 
+    vf, vg, uf, ug, hf, hfg, sf, sg, P_sat_at_T_csv = sat_props
+
     # Calculate actual specific properties
     v = vf + x * (vg - vf)
     u = uf + x * (ug - uf)
@@ -309,7 +577,28 @@ def calculate_water_properties(T_C, P_bar, x):
 # ------------------------------
 
 
-app = FastAPI()
+def _warmup():
+    """
+    Runs each hot path once with representative inputs so JIT compilation,
+    IAPWS initialisation and the first cache fills happen before any request.
+    """
+    _solve_ideal_gas_process(1, 278.7, 100.0, 0.8, 2.0, 1.0, 1.4, 0.7175, 1.0045, 0.287, 1.3)
+    get_tsat(1.0)
+    get_psat(100.0)
+    if _T_list:
+        saturation_props_by_T(100.0)
+        calculate_water_properties(150.0, 5.0, 0.5)
+    if IAPWS_AVAILABLE:
+        calculate_water_properties_iapws(300.0, 10.0, 0.5)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    _warmup()
+    yield
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # ---- STATIC FILES ----
 static_path = Path("static")
@@ -318,22 +607,134 @@ os.makedirs(images_path, exist_ok=True)  # Make sure images folder exists
 if static_path.exists():
     app.mount("/static", StaticFiles(directory="static"), name="static")
 else:
-    print("⚠️ Warning: 'static' folder not found")
+    logger.warning("'static' folder not found")
 
 # ---- TEMPLATES ----
 templates = Jinja2Templates(directory="templates")
 
 # ---- IN-MEMORY STORAGE ----
-gas_data_store = {}
+@dataclass(slots=True, kw_only=True)
+class WaterState:
+    """State 1 for water/steam, keeping the exact user inputs next to the display values."""
+    gas_name: str = "water"
+    T_original: float  # EXACT user input
+    P_original: float  # EXACT user input
+    T_sat_at_P: Optional[float]  # Interpolated T_sat at P_original
+    P_sat_at_T: Optional[float]  # Interpolated P_sat at T_original
+    T: float  # °C
+    P: float  # bar
+    x: float
+    phase: str
+    v: float
+    u: float
+    h: float
+    s: float
+    vf: float
+    vg: float
+    uf: float
+    ug: float
+    hf: float
+    hfg: float
+    sf: float
+    sg: float
+    source: str
+
+
+@dataclass(slots=True, kw_only=True)
+class IdealGasState:
+    """State 1 for an ideal gas."""
+    gas_name: str
+    T: float  # K
+    P: float  # kPa
+    v: float  # m³/kg
+    cp: float
+    cv: float
+    R: float
+    k: float
+    u: float
+    h: float
+    s: float
+
+
+# Properties stored per state in WaterProcessInfo, as one float64 record each
+_STATE_KEYS = ("T", "P", "v", "u", "h", "s", "x")
+_STATE_DTYPE = np.dtype([(key, "f8") for key in _STATE_KEYS])
+
+
+@dataclass(slots=True, kw_only=True)
+class WaterProcessInfo:
+    """Final water process submission with both states' T, P, v, u, h, s, x."""
+    process: str
+    gas_name: str = "water"
+    states: np.ndarray  # shape (2,), _STATE_DTYPE: State 1 then State 2
+
+    def as_dict(self) -> dict:
+        """JSON form, with the states as state1/state2 dicts."""
+        state1, state2 = (dict(zip(_STATE_KEYS, row)) for row in self.states.tolist())
+        return {"process": self.process, "gas_name": self.gas_name,
+                "state1": state1, "state2": state2}
+
+
+@dataclass(slots=True, kw_only=True)
+class IdealGasProcessInfo:
+    """Final ideal gas process submission; State 2 is derived from the ratios."""
+    process: str
+    gas_name: str
+    v_ratio: Optional[float]
+    p_ratio: Optional[float]
+    n_value: Optional[float]
+
+
+@dataclass(slots=True)
+class SimulationStore:
+    """Latest submissions shared between the routes (one simulation at a time)."""
+    latest: Optional[WaterState | IdealGasState] = None  # State 1
+    state2: Optional[dict] = None  # Live State 2 from /submit-next-stage
+    process_info: Optional[WaterProcessInfo | IdealGasProcessInfo] = None
+
+
+gas_data_store = SimulationStore()
 
 # ---- PREDEFINED GASES ----
+class GasConstants(NamedTuple):
+    """Ideal gas constants in kJ/(kg·K), with cv and cp derived from R and k."""
+    R: float
+    k: float
+    cv: float
+    cp: float
+
+
+def _gas_constants(R, k):
+    cv = R / (k - 1)
+    return GasConstants(R=R, k=k, cv=cv, cp=k * cv)
+
+
+# R and k are all that is given; cv and cp are tabulated once here
 predefined_gases = {
-    "air": {"R": 0.287, "k": 1.4},
-    "nitrogen": {"R": 0.2968, "k": 1.4},
-    "methane": {"R": 0.518, "k": 1.299},
-    "oxygen": {"R": 0.2598, "k": 1.395}
+    "air": _gas_constants(R=0.287, k=1.4),
+    "nitrogen": _gas_constants(R=0.2968, k=1.4),
+    "methane": _gas_constants(R=0.518, k=1.299),
+    "oxygen": _gas_constants(R=0.2598, k=1.395)
 }
 
+# ---- RESPONSE ROUNDING ----
+# Output fields and their display decimals. Fields sharing a decimal count are
+# rounded together with one np.round call instead of one round() per field.
+_WATER_KEYS = ("v", "u", "h", "s", "vf", "vg", "uf", "ug", "hf", "hfg", "sf", "sg")
+_WATER_DECIMALS = np.array([6, 2, 2, 4, 6, 4, 2, 2, 2, 2, 4, 4], dtype=np.int8)
+
+_NEXT_STAGE_KEYS = ("T", "P", "v", "x", "u", "h", "s")
+_NEXT_STAGE_DECIMALS = np.array([2, 3, 6, 4, 2, 2, 4], dtype=np.int8)
+
+
+def _round_fields(props, keys, decimals):
+    """Returns {key: rounded value} for keys, treating missing keys as 0."""
+    vals = np.fromiter((props.get(k, 0) for k in keys), dtype=np.float64, count=len(keys))
+    for d in np.unique(decimals):
+        mask = decimals == d
+        vals[mask] = np.round(vals[mask], int(d))
+    return dict(zip(keys, vals.tolist()))
+
 
 # -------------------------
 #   ROUTES
@@ -355,13 +756,13 @@ def sim1(request: Request):
 
 @app.get("/simulation2.html")
 def sim2(request: Request):
-    stored = gas_data_store.get("latest_submission", {})
+    stored = gas_data_store.latest or {}
     return templates.TemplateResponse("simulation2.html", {"request": request, "data": stored})
 
 
 @app.get("/simulation3.html")
 def sim3(request: Request):
-    stored = gas_data_store.get("latest_submission", {})
+    stored = gas_data_store.latest or {}
     return templates.TemplateResponse("simulation3.html", {"request": request, "data": stored})
 
 
@@ -403,7 +804,8 @@ async def submit_gas(request: Request):
             P_sat_at_T, _ = get_psat(T_input)
 
             # Calculate properties using IAPWS or interpolation
-            water_props = calculate_water_properties(T_input, P_input, x)
+            water_props = calculate_water_properties(T_input, P_input, x,
+                                                     T_sat_at_P=T_sat_at_P, P_sat_at_T=P_sat_at_T)
 
             # Determine phase
             if x == 0 or (T_sat_at_P and T_input < T_sat_at_P):
@@ -415,33 +817,21 @@ async def submit_gas(request: Request):
             else:
                 phase = "saturated"
 
-            gas_data_store["latest_submission"] = {
-                "gas_name": "water",
+            gas_data_store.latest = WaterState(
                 # Store original inputs AND interpolated values
-                "T_original": T_input,  # EXACT user input
-                "P_original": P_input,  # EXACT user input
-                "T_sat_at_P": T_sat_at_P,  # Interpolated T_sat at P_input
-                "P_sat_at_T": P_sat_at_T,  # Interpolated P_sat at T_input
+                T_original=T_input,
+                P_original=P_input,
+                T_sat_at_P=T_sat_at_P,
+                P_sat_at_T=P_sat_at_T,
                 # Display values
-                "T": T_input,
-                "P": water_props["P"],  # Use consistent P from calculation
-                "x": water_props["x"],
-                "phase": phase,
-                "v": round(water_props["v"], 6),
-                "u": round(water_props["u"], 2),
-                "h": round(water_props["h"], 2),
-                "s": round(water_props["s"], 4),
-                # Saturation properties for reference
-                "vf": round(water_props.get("vf", 0), 6),
-                "vg": round(water_props.get("vg", 0), 4),
-                "uf": round(water_props.get("uf", 0), 2),
-                "ug": round(water_props.get("ug", 0), 2),
-                "hf": round(water_props.get("hf", 0), 2),
-                "hfg": round(water_props.get("hfg", 0), 2),
-                "sf": round(water_props.get("sf", 0), 4),
-                "sg": round(water_props.get("sg", 0), 4),
-                "source": water_props.get("source", "CSV")
-            }
+                T=T_input,
+                P=water_props["P"],  # Use consistent P from calculation
+                x=water_props["x"],
+                phase=phase,
+                # v, u, h, s plus saturation properties for reference
+                **_round_fields(water_props, _WATER_KEYS, _WATER_DECIMALS),
+                source=water_props.get("source", "CSV")
+            )
 
         # ---------------- Ideal Gas ----------------
         else:
@@ -454,70 +844,83 @@ async def submit_gas(request: Request):
             T = float(data_json.get("T", 300))  # Placeholder default T
 
             if gas_name != "custom":
-                R = predefined_gases[gas_name]["R"]
-                k = predefined_gases[gas_name]["k"]
-                cv = R / (k - 1)
-                cp = k * cv
+                R, k, cv, cp = predefined_gases[gas_name]
             else:
                 if cp is None or cv is None or cp <= cv:
-                    return JSONResponse(
+                    return ORJSONResponse(
                         {"status": "error", "message": "Invalid cp/cv for custom gas"},
                         status_code=400
                     )
                 R = cp - cv
                 k = cp / cv
 
-            # Recalculate T using P and v
-            T = P * v / R
-
-            # Calculate Ideal Gas u and h
-            u = cv * T
-            h = cp * T
+            # Recalculate T using P and v, then Ideal Gas u and h
+            T, u, h = _ideal_gas_state(P, v, R, cv, cp)
             s = 0  # Placeholder for initial entropy
 
-            gas_data_store["latest_submission"] = {
-                "gas_name": gas_name,
-                "T": round(T, 5),  # K
-                "P": P,  # kPa
-                "v": v,  # m³/kg
-                "cp": round(cp, 5),
-                "cv": round(cv, 5),
-                "R": round(R, 5),
-                "k": round(k, 5),
-                "u": round(u, 2),
-                "h": round(h, 2),
-                "s": round(s, 4)
-            }
-
-        return JSONResponse({"status": "success"})
+            gas_data_store.latest = IdealGasState(
+                gas_name=gas_name,
+                T=round(T, 5),
+                P=P,
+                v=v,
+                cp=round(cp, 5),
+                cv=round(cv, 5),
+                R=round(R, 5),
+                k=round(k, 5),
+                u=round(u, 2),
+                h=round(h, 2),
+                s=round(s, 4)
+            )
+
+        return ORJSONResponse({"status": "success"})
 
     except Exception as e:
-        return JSONResponse({"status": "error", "message": f"Submission failed: {str(e)}"}, status_code=400)
+        return ORJSONResponse({"status": "error", "message": f"Submission failed: {str(e)}"}, status_code=400)
 
 
 # -------------------------
 # GET SATURATION TEMPERATURE/PRESSURE (for frontend)
 # -------------------------
+# Every out-of-range query clamps to a table end, so those bodies are serialized once
+if _P_list and _T_list:
+    _TSAT_CLAMP_LO = orjson.dumps({"Tsat": get_tsat(_P_list[0])[0], "clamped": True})
+    _TSAT_CLAMP_HI = orjson.dumps({"Tsat": get_tsat(_P_list[-1])[0], "clamped": True})
+    _PSAT_CLAMP_LO = orjson.dumps({"Psat": get_psat(_T_list[0])[0], "clamped": True})
+    _PSAT_CLAMP_HI = orjson.dumps({"Psat": get_psat(_T_list[-1])[0], "clamped": True})
+
+
 @app.get("/get-tsat")
-def get_tsat_api(P: float = Query(...)):
+async def get_tsat_api(P: float = Query(...)):
     """
     Returns saturation temperature in °C for a given P (bar) using linear interpolation.
     """
+    if _P_list:
+        if P < _P_list[0]:
+            return Response(_TSAT_CLAMP_LO, media_type="application/json")
+        if P > _P_list[-1]:
+            return Response(_TSAT_CLAMP_HI, media_type="application/json")
+
     Tsat, clamped = get_tsat(P)
     if Tsat is None:
-        return JSONResponse({"error": "Water table not loaded."}, status_code=500)
-    return {"Tsat": Tsat, "clamped": clamped}
+        return ORJSONResponse({"error": "Water table not loaded."}, status_code=500)
+    return ORJSONResponse({"Tsat": Tsat, "clamped": clamped})
 
 
 @app.get("/get-psat")
-def get_psat_api(T: float = Query(...)):
+async def get_psat_api(T: float = Query(...)):
     """
     Returns saturation pressure in bar for a given T (°C) using linear interpolation.
     """
+    if _T_list:
+        if T < _T_list[0]:
+            return Response(_PSAT_CLAMP_LO, media_type="application/json")
+        if T > _T_list[-1]:
+            return Response(_PSAT_CLAMP_HI, media_type="application/json")
+
     Psat, clamped = get_psat(T)
     if Psat is None:
-        return JSONResponse({"error": "Water table not loaded."}, status_code=500)
-    return {"Psat": Psat, "clamped": clamped}
+        return ORJSONResponse({"error": "Water table not loaded."}, status_code=500)
+    return ORJSONResponse({"Psat": Psat, "clamped": clamped})
 
 
 # -------------------------
@@ -525,16 +928,18 @@ def get_psat_api(T: float = Query(...)):
 # -------------------------
 @app.get("/api/k")
 def get_k():
-    data = gas_data_store.get("latest_submission")
-    if data and "k" in data:
-        return {"k": data["k"]}
-    return {"error": "No ideal gas data stored yet"}
+    data = gas_data_store.latest
+    if isinstance(data, IdealGasState):
+        return ORJSONResponse({"k": data.k})
+    return ORJSONResponse({"error": "No ideal gas data stored yet"})
 
 
 @app.get("/check-gas")
 def check_gas():
     """Returns State 1 data."""
-    return gas_data_store.get("latest_submission", {"message": "No data stored"})
+    if gas_data_store.latest is None:
+        return ORJSONResponse({"message": "No data stored"})
+    return ORJSONResponse(asdict(gas_data_store.latest))
 
 
 # -------------------------
@@ -549,20 +954,20 @@ async def submit_next_stage(request: Request):
     """
     try:
         data = await request.json()
-        state1 = gas_data_store.get("latest_submission", {})
+        state1 = gas_data_store.latest
 
         # Check for valid State 1 data
-        if not state1 or state1.get("gas_name") != "water":
-            return JSONResponse({"status": "error", "message": "State 1 data not found or is not water."},
+        if not isinstance(state1, WaterState):
+            return ORJSONResponse({"status": "error", "message": "State 1 data not found or is not water."},
                                 status_code=400)
 
         # Get BOTH original and interpolated values from State 1
-        T_original = state1.get("T_original")  # User's EXACT temperature input
-        P_original = state1.get("P_original")  # User's EXACT pressure input
+        T_original = state1.T_original  # User's EXACT temperature input
+        P_original = state1.P_original  # User's EXACT pressure input
 
-        # Get interpolated saturation values
-        T_sat_at_P, _ = get_tsat(P_original)
-        P_sat_at_T, _ = get_psat(T_original)
+        # Interpolated saturation values, already computed when State 1 was submitted
+        T_sat_at_P = state1.T_sat_at_P
+        P_sat_at_T = state1.P_sat_at_T
 
         # State 2 User Input Values
         process = data.get("process", "Isobaric")
@@ -602,7 +1007,7 @@ async def submit_next_stage(request: Request):
             calc_T = T_input if T_input is not None else T_sat_at_P
 
         elif process == "Isochoric":
-            v_fixed = state1["v"]  # Use calculated v from State 1
+            v_fixed = state1.v  # Use calculated v from State 1
             # For isochoric, we need to handle it differently
             calc_T = T_input if T_input is not None else T_original
             calc_P = P_input if P_input is not None else P_original
@@ -611,8 +1016,8 @@ async def submit_next_stage(request: Request):
 
         # Determine phase and adjust quality based on process
         if process == "Isobaric" and calc_T is not None:
-            # Get saturation temperature at the fixed pressure
-            T_sat_at_fixed_P, _ = get_tsat(calc_P)
+            # Saturation temperature at the fixed pressure (calc_P is P_original)
+            T_sat_at_fixed_P = T_sat_at_P
             if T_sat_at_fixed_P:
                 if calc_T > T_sat_at_fixed_P:
                     # Superheated vapor
@@ -625,8 +1030,8 @@ async def submit_next_stage(request: Request):
                     calc_x = x_input if x_input is not None else 0.5
 
         elif process == "Isothermal" and calc_P is not None:
-            # Get saturation pressure at the fixed temperature
-            P_sat_at_fixed_T, _ = get_psat(calc_T)
+            # Saturation pressure at the fixed temperature (calc_T is T_original)
+            P_sat_at_fixed_T = P_sat_at_T
             if P_sat_at_fixed_T:
                 if calc_P < P_sat_at_fixed_T:
                     # Superheated vapor
@@ -645,13 +1050,19 @@ async def submit_next_stage(request: Request):
         # Calculate properties using the enhanced function with IAPWS
         try:
             # Use calculation values for property calculation
+            state2_T = calc_T if calc_T is not None else T_original
+            state2_P = calc_P if calc_P is not None else P_original
+            # Reuse State 1 saturation values wherever an input is unchanged
             state2_props = calculate_water_properties(
-                calc_T if calc_T is not None else T_original,
-                calc_P if calc_P is not None else P_original,
-                calc_x
+                state2_T,
+                state2_P,
+                calc_x,
+                T_sat_at_P=T_sat_at_P if state2_P == P_original else None,
+                P_sat_at_T=P_sat_at_T if state2_T == T_original else None,
+                saturation_detail=False  # Only T, P, v, u, h, s, x are used from State 2
             )
         except ValueError as e:
-            return JSONResponse({"status": "error", "message": f"Could not calculate properties: {str(e)}"},
+            return ORJSONResponse({"status": "error", "message": f"Could not calculate properties: {str(e)}"},
                                 status_code=400)
 
         # Override display values with the correct ones
@@ -670,17 +1081,11 @@ async def submit_next_stage(request: Request):
         else:
             phase = "two_phase"
 
-        gas_data_store["state2_submission"] = state2_props
+        gas_data_store.state2 = state2_props
 
-        return JSONResponse({
+        return ORJSONResponse({
             "status": "success",
-            "T": round(state2_props["T"], 2),
-            "P": round(state2_props["P"], 3),
-            "v": round(state2_props["v"], 6),
-            "x": round(state2_props["x"], 4),
-            "u": round(state2_props["u"], 2),
-            "h": round(state2_props["h"], 2),
-            "s": round(state2_props["s"], 4),
+            **_round_fields(state2_props, _NEXT_STAGE_KEYS, _NEXT_STAGE_DECIMALS),
             "phase": phase,
             "T_sat_at_P": T_sat_at_P,
             "P_sat_at_T": P_sat_at_T,
@@ -688,7 +1093,7 @@ async def submit_next_stage(request: Request):
         })
 
     except Exception as e:
-        return JSONResponse({"status": "error", "message": f"Dynamic update failed: {str(e)}"}, status_code=400)
+        return ORJSONResponse({"status": "error", "message": f"Dynamic update failed: {str(e)}"}, status_code=400)
 
 
 # -------------------------
@@ -703,14 +1108,14 @@ async def submit_process(request: Request):
     """
     try:
         data = await request.json()
-        state1 = gas_data_store.get("latest_submission", {})
-        gas_name = state1.get("gas_name", "unknown")
+        state1 = gas_data_store.latest
+        gas_name = state1.gas_name if state1 else "unknown"
 
-        print(f"📥 Received process submission for {gas_name}: {data.get('process')}")
+        logger.debug("Received process submission for %s: %s", gas_name, data.get("process"))
 
         if gas_name == "water":
             # For water: we need to ensure state2 data exists
-            state2_data = gas_data_store.get("state2_submission", {})
+            state2_data = gas_data_store.state2 or {}
             
             # If state2_data is empty, try to get from the request
             if not state2_data and "state2" in data:
@@ -719,8 +1124,8 @@ async def submit_process(request: Request):
             if not state2_data:
                 # Last resort: calculate from current inputs
                 try:
-                    T_input = data.get("T", state1.get("T_original"))
-                    P_input = data.get("P", state1.get("P_original"))
+                    T_input = data.get("T", state1.T_original)
+                    P_input = data.get("P", state1.P_original)
                     x_input = data.get("x", 0.5)
                     
                     if T_input is not None and P_input is not None:
@@ -733,7 +1138,7 @@ async def submit_process(request: Request):
                     pass
             
             if not state2_data:
-                return JSONResponse({
+                return ORJSONResponse({
                     "status": "error", 
                     "message": "State 2 data not available. Please input values and recalculate."
                 }, status_code=400)
@@ -745,52 +1150,35 @@ async def submit_process(request: Request):
                     state2_data[prop] = 0.0
 
             # Store complete process information
-            gas_data_store["process_info"] = {
-                "process": data.get("process", "Unknown"),
-                "gas_name": "water",
-                "state1": {
-                    "T": state1.get("T"),
-                    "P": state1.get("P"),
-                    "v": state1.get("v"),
-                    "u": state1.get("u"),
-                    "h": state1.get("h"),
-                    "s": state1.get("s"),
-                    "x": state1.get("x", 0)
-                },
-                "state2": {
-                    "T": float(state2_data.get("T", 0)),
-                    "P": float(state2_data.get("P", 0)),
-                    "v": float(state2_data.get("v", 0)),
-                    "u": float(state2_data.get("u", 0)),
-                    "h": float(state2_data.get("h", 0)),
-                    "s": float(state2_data.get("s", 0)),
-                    "x": float(state2_data.get("x", 0))
-                }
-            }
+            gas_data_store.process_info = WaterProcessInfo(
+                process=data.get("process", "Unknown"),
+                states=np.array([
+                    (state1.T, state1.P, state1.v, state1.u, state1.h, state1.s, state1.x),
+                    tuple(float(state2_data.get(key, 0)) for key in _STATE_KEYS),
+                ], dtype=_STATE_DTYPE)
+            )
             
-            print(f"✅ Stored water process info:")
-            print(f"   Process: {data.get('process')}")
-            print(f"   State 1: T={state1.get('T')}°C, P={state1.get('P')}bar, v={state1.get('v')}m³/kg")
-            print(f"   State 2: T={state2_data.get('T')}°C, P={state2_data.get('P')}bar, v={state2_data.get('v')}m³/kg")
+            logger.debug("Stored water process info: %s, State 1: T=%s°C, P=%sbar, v=%sm³/kg, "
+                         "State 2: T=%s°C, P=%sbar, v=%sm³/kg", data.get("process"),
+                         state1.T, state1.P, state1.v,
+                         state2_data.get("T"), state2_data.get("P"), state2_data.get("v"))
             
         else:
             # Ideal Gas logic
-            gas_data_store["process_info"] = {
-                "process": data.get("process", "Unknown"),
-                "gas_name": gas_name,
-                "v_ratio": data.get("v_ratio"),
-                "p_ratio": data.get("p_ratio"),
-                "n_value": data.get("n_value")
-            }
-            print(f"✅ Stored ideal gas process info for {gas_name}")
+            gas_data_store.process_info = IdealGasProcessInfo(
+                process=data.get("process", "Unknown"),
+                gas_name=gas_name,
+                v_ratio=data.get("v_ratio"),
+                p_ratio=data.get("p_ratio"),
+                n_value=data.get("n_value")
+            )
+            logger.debug("Stored ideal gas process info for %s", gas_name)
 
-        return JSONResponse({"status": "success"})
+        return ORJSONResponse({"status": "success"})
 
     except Exception as e:
-        print(f"❌ Error in submit-process: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return JSONResponse({"status": "error", "message": str(e)}, status_code=400)
+        logger.exception("Error in submit-process")
+        return ORJSONResponse({"status": "error", "message": str(e)}, status_code=400)
 
 
 
@@ -799,12 +1187,276 @@ async def submit_process(request: Request):
 # -------------------------
 @app.get("/get-simulate-results")
 def get_simulate_results():
-    return gas_data_store.get("process_info", {"message": "No process data available"})
+    if gas_data_store.process_info is None:
+        return ORJSONResponse({"message": "No process data available"})
+    process_info = gas_data_store.process_info
+    if isinstance(process_info, WaterProcessInfo):
+        return ORJSONResponse(process_info.as_dict())
+    return ORJSONResponse(asdict(process_info))
+
+
+# -------------------------
+#   SVG DIAGRAMS
+# -------------------------
+# The diagrams are a few polylines and two state markers, so they are written
+# as SVG text directly rather than through a plotting library.
+_SVG_WIDTH, _SVG_HEIGHT = 640, 480
+_SVG_LEFT, _SVG_RIGHT, _SVG_TOP, _SVG_BOTTOM = 80, 20, 40, 55
+_SVG_PAD = 0.2  # autoscale margin on each side, as a fraction of the data range
+
+
+def _nice_ticks(lo: float, hi: float, count: int = 6) -> list[float]:
+    """Round tick values (1, 2, 5 x 10^k steps) covering [lo, hi]."""
+    span = hi - lo
+    if not span > 0:
+        return [lo]
+    raw = span / max(count - 1, 1)
+    mag = 10 ** math.floor(math.log10(raw))
+    step = next(m * mag for m in (1, 2, 5, 10) if m * mag >= raw)
+    first = math.ceil(lo / step) * step
+    n = int(math.floor((hi - first) / step + 1e-9)) + 1
+    return [first + i * step for i in range(n)]
+
+
+def _axis_limits(values, lim, log: bool) -> tuple[float, float]:
+    """Axis range in plot units (log10 for log axes), padded unless `lim` is fixed."""
+    if lim is not None:
+        lo, hi = lim
+    else:
+        lo, hi = min(values), max(values)
+    if log:
+        lo, hi = math.log10(lo), math.log10(hi)
+    if lim is None:
+        span = hi - lo
+        pad = span * _SVG_PAD if span > 0 else (abs(hi) * 0.05 or 1.0)
+        lo, hi = lo - pad, hi + pad
+    return lo, hi
+
+
+def _axis_ticks(lo: float, hi: float, log: bool) -> list[tuple[float, str]]:
+    """(position, label) pairs for one axis, positions in plot units."""
+    if log:
+        decades = range(math.ceil(lo), math.floor(hi) + 1)
+        if len(decades) >= 2:
+            return [(d, f"{10.0 ** d:g}") for d in decades]
+        return [(t, f"{10.0 ** t:.3g}") for t in _nice_ticks(lo, hi, 4)]
+    return [(t, f"{t:.6g}") for t in _nice_ticks(lo, hi)]
+
+
+class _Backdrop(NamedTuple):
+    """
+    Pre-rendered SVG drawn behind a diagram's curves. `svg` is in data units
+    (log10 on log axes) and is placed with the diagram's axis transform, so the
+    same text serves any axis limits.
+    """
+    svg: str
+    x_range: tuple[float, float]
+    y_range: tuple[float, float]
+    legend: tuple  # (stroke, stroke_width, opacity, label) entries
+
+
+def _render_svg(curves, states, *, title: str, xlabel: str, ylabel: str,
+                xlim=None, ylim=None, xlog: bool = False, ylog: bool = False,
+                legend: bool = False, backdrop: Optional[_Backdrop] = None) -> str:
+    """
+    Renders one diagram as SVG text.
+
+    `curves` is a list of (xs, ys, stroke, stroke_width, opacity, label) tuples
+    and `states` a list of (x, y) points drawn as red markers.
+    """
+    all_x = [x for c in curves for x in c[0]] + [p[0] for p in states]
+    all_y = [y for c in curves for y in c[1]] + [p[1] for p in states]
+    if backdrop is not None:
+        all_x.extend(backdrop.x_range)
+        all_y.extend(backdrop.y_range)
+    x0, x1 = _axis_limits(all_x, xlim, xlog)
+    y0, y1 = _axis_limits(all_y, ylim, ylog)
+
+    left, top = _SVG_LEFT, _SVG_TOP
+    right, bottom = _SVG_WIDTH - _SVG_RIGHT, _SVG_HEIGHT - _SVG_BOTTOM
+    sx = (right - left) / ((x1 - x0) or 1.0)
+    sy = (bottom - top) / ((y1 - y0) or 1.0)
+
+    def px(x):
+        return left + ((math.log10(x) if xlog else x) - x0) * sx
+
+    def py(y):
+        return bottom - ((math.log10(y) if ylog else y) - y0) * sy
+
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{_SVG_WIDTH}" height="{_SVG_HEIGHT}" '
+        f'viewBox="0 0 {_SVG_WIDTH} {_SVG_HEIGHT}" font-family="sans-serif" font-size="11">',
+        f'<rect width="{_SVG_WIDTH}" height="{_SVG_HEIGHT}" fill="white"/>',
+        f'<clipPath id="plot-area"><rect x="{left}" y="{top}" '
+        f'width="{right - left}" height="{bottom - top}"/></clipPath>',
+    ]
+
+    for t, label in _axis_ticks(x0, x1, xlog):
+        x = left + (t - x0) * sx
+        out.append(f'<line x1="{x:.2f}" y1="{top}" x2="{x:.2f}" y2="{bottom}" stroke="#ddd"/>')
+        out.append(f'<text x="{x:.2f}" y="{bottom + 16}" text-anchor="middle">{label}</text>')
+    for t, label in _axis_ticks(y0, y1, ylog):
+        y = bottom - (t - y0) * sy
+        out.append(f'<line x1="{left}" y1="{y:.2f}" x2="{right}" y2="{y:.2f}" stroke="#ddd"/>')
+        out.append(f'<text x="{left - 6}" y="{y + 4:.2f}" text-anchor="end">{label}</text>')
+    out.append(f'<rect x="{left}" y="{top}" width="{right - left}" height="{bottom - top}" '
+               f'fill="none" stroke="black"/>')
+
+    out.append('<g clip-path="url(#plot-area)">')
+    if backdrop is not None:
+        out.append(f'<g transform="matrix({sx:.6g} 0 0 {-sy:.6g} {left - x0 * sx:.6g} '
+                   f'{bottom + y0 * sy:.6g})">{backdrop.svg}</g>')
+    for xs, ys, stroke, width, opacity, _ in curves:
+        points = " ".join(f"{px(x):.2f},{py(y):.2f}" for x, y in zip(xs, ys))
+        out.append(f'<polyline points="{points}" fill="none" stroke="{stroke}" '
+                   f'stroke-width="{width}" stroke-opacity="{opacity}"/>')
+    for x, y in states:
+        out.append(f'<circle cx="{px(x):.2f}" cy="{py(y):.2f}" r="5" fill="red"/>')
+    out.append('</g>')
+
+    if legend:
+        labelled = [*(backdrop.legend if backdrop is not None else ()),
+                    *(c[2:] for c in curves if c[5])]
+        box_w = 24 + 7 * max(len(c[3]) for c in labelled)
+        bx = right - box_w - 8
+        out.append(f'<rect x="{bx}" y="{top + 8}" width="{box_w}" height="{8 + 16 * len(labelled)}" '
+                   f'fill="white" fill-opacity="0.8" stroke="#ccc"/>')
+        for i, (stroke, width, opacity, label) in enumerate(labelled):
+            ly = top + 20 + 16 * i
+            out.append(f'<line x1="{bx + 6}" y1="{ly - 4}" x2="{bx + 20}" y2="{ly - 4}" '
+                       f'stroke="{stroke}" stroke-width="{width}" stroke-opacity="{opacity}"/>')
+            out.append(f'<text x="{bx + 24}" y="{ly}">{escape(label)}</text>')
+
+    out.append(f'<text x="{(left + right) / 2}" y="{top - 14}" text-anchor="middle" '
+               f'font-size="13">{escape(title)}</text>')
+    out.append(f'<text x="{(left + right) / 2}" y="{_SVG_HEIGHT - 14}" text-anchor="middle">'
+               f'{escape(xlabel)}</text>')
+    out.append(f'<text transform="translate(18 {(top + bottom) / 2}) rotate(-90)" '
+               f'text-anchor="middle">{escape(ylabel)}</text>')
+    out.append('</svg>')
+    return "\n".join(out)
+
+
+def render_pv_svg(v_vals, P_vals, states, *, title="P–v Diagram", P_unit="kPa",
+                  stroke="#1f77b4", stroke_width=2, label="", **axes) -> str:
+    """P–v diagram: the process curve and the state points, over any backdrop."""
+    curves = [(v_vals, P_vals, stroke, stroke_width, 1, label)]
+    return _render_svg(curves, states, title=title, xlabel="v (m³/kg)",
+                       ylabel=f"P ({P_unit})", **axes)
+
+
+def render_ts_svg(s_vals, T_vals, states, *, title="T–s Diagram", T_unit="K",
+                  stroke="#1f77b4", stroke_width=2, label="", **axes) -> str:
+    """T–s diagram: the process curve and the state points, over any backdrop."""
+    curves = [(s_vals, T_vals, stroke, stroke_width, 1, label)]
+    return _render_svg(curves, states, title=title, xlabel="s (kJ/kg·K)",
+                       ylabel=f"T ({T_unit})", **axes)
+
+
+# Diagrams are saved under a hash of their inputs, so an existing file is
+# always current and repeat requests skip rendering altogether.
+_IMAGE_CACHE_LIMIT = 500
+# Saved diagrams outlive restarts, so the hash also covers everything else that
+# shapes the drawing. Bump this whenever the rendering code changes.
+_RENDER_VERSION = 1
+
+
+def _save_plot(kind: str, inputs: tuple, render) -> str:
+    """
+    Returns the URL of the `kind` diagram for `inputs`, calling render() to
+    write it only when no file for these inputs exists yet.
+    """
+    key = hashlib.blake2b(repr((_RENDER_VERSION, SEUIF97_AVAILABLE, kind, inputs)).encode(), digest_size=16).hexdigest()
+    plot_file = images_path / f"{kind}_{key}.svg"
+    if not plot_file.exists():
+        # Write to a temp file first so a client never reads a partial diagram
+        tmp_path = plot_file.with_name(f"{plot_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp_path.write_bytes(render().encode("utf-8"))
+            os.replace(tmp_path, plot_file)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        try:
+            _prune_plots()
+        except OSError as e:
+            logger.warning("Could not prune saved diagrams: %s", e)
+    return f"/static/images/{plot_file.name}"
+
+
+def _prune_plots():
+    """Deletes the oldest saved diagrams once there are more than _IMAGE_CACHE_LIMIT."""
+    plots = []
+    with os.scandir(images_path) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".svg"):
+                continue
+            try:
+                plots.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                pass  # Already pruned by a concurrent request
+    if len(plots) <= _IMAGE_CACHE_LIMIT:
+        return
+    plots.sort()
+    for _, old in plots[:len(plots) - _IMAGE_CACHE_LIMIT]:
+        Path(old).unlink(missing_ok=True)
 
 
 # -------------------------
 #   CALCULATE RESULTS AND SAVE PLOTS
 # -------------------------
+@lru_cache(maxsize=256)
+def _dome(T_lo: int, T_hi: int):
+    """
+    Saturation dome between T_lo and T_hi (°C) as (T, P_bar, vf, vg, sf, sg)
+    tuples of 50 points. Uses SEUIF97's compiled IF97 when it is installed,
+    otherwise interpolates straight from the sorted table columns, with the
+    range trimmed to the table so every point is a real interpolation.
+    """
+    if SEUIF97_AVAILABLE:
+        T_range = np.linspace(max(0.01, T_lo), min(_IAPWS_T_CRIT - 273.15, T_hi), 50).tolist()
+        return (
+            tuple(T_range),
+            tuple(seuif97.tx2p(T, 0.0) * 10.0 for T in T_range),  # MPa -> bar
+            tuple(seuif97.tx2v(T, 0.0) for T in T_range),
+            tuple(seuif97.tx2v(T, 1.0) for T in T_range),
+            tuple(seuif97.tx2s(T, 0.0) for T in T_range),
+            tuple(seuif97.tx2s(T, 1.0) for T in T_range),
+        )
+
+    T_range = np.linspace(max(0.01, T_lo, _T_sorted[0]), min(374, T_hi, _T_sorted[-1]), 50)
+    return (tuple(T_range.tolist()),) + tuple(
+        tuple(np.interp(T_range, _T_sorted, _props_by_T[col]).tolist())
+        for col in ("P_bar", "vf", "vg", "sf", "sg"))
+
+
+@lru_cache(maxsize=256)
+def _dome_backdrop(diagram: str, T_lo: int, T_hi: int, xlog: bool = False, ylog: bool = False):
+    """
+    The saturation dome of _dome(T_lo, T_hi) as a _Backdrop for the "pv" or "ts"
+    diagram. The polylines are formatted once per range and axis scale; each
+    request only supplies the transform that places them.
+    """
+    T_range, P_sat_vals, vf_vals, vg_vals, sf_vals, sg_vals = _dome(T_lo, T_hi)
+    if diagram == "pv":
+        lines = ((vf_vals, P_sat_vals, "blue"), (vg_vals, P_sat_vals, "red"))
+    else:
+        lines = ((sf_vals, T_range, "blue"), (sg_vals, T_range, "red"))
+
+    svg = []
+    for xs, ys, stroke in lines:
+        gx = [math.log10(x) for x in xs] if xlog else xs
+        gy = [math.log10(y) for y in ys] if ylog else ys
+        points = " ".join(f"{x:.6g},{y:.6g}" for x, y in zip(gx, gy))
+        svg.append(f'<polyline points="{points}" fill="none" stroke="{stroke}" stroke-width="1" '
+                   f'stroke-opacity="0.5" vector-effect="non-scaling-stroke"/>')
+
+    all_x = lines[0][0] + lines[1][0]
+    all_y = lines[0][1] + lines[1][1]
+    return _Backdrop("".join(svg), (min(all_x), max(all_x)), (min(all_y), max(all_y)),
+                     (("blue", 1, 0.5, "Saturated Liquid"), ("red", 1, 0.5, "Saturated Vapor")))
+
+
 PROCESS_MAP = {
     "Constant Volume": "isochoric",
     "Constant Pressure": "isobaric",
@@ -814,240 +1466,269 @@ PROCESS_MAP = {
 }
 
 
+def _ideal_gas_pv_svg(process_type, exponent, v1, P1, v2, P2) -> str:
+    """P–v diagram of an ideal-gas process between two states."""
+    if process_type in ("isochoric", "isobaric") or v1 == v2:
+        # Straight segment: the two states are the whole curve
+        v_vals, P_vals = [v1, v2], [P1, P2]
+    else:
+        # P v^n = const (n = 1 when isothermal). Geometric spacing follows the
+        # power law, so 40 points are enough for a smooth curve.
+        v_vals = np.geomspace(v1, v2, 40)
+        P_vals = P1 * (v1 / v_vals) ** exponent
+        v_vals, P_vals = v_vals.tolist(), P_vals.tolist()
+
+    return render_pv_svg(v_vals, P_vals, [(v1, P1), (v2, P2)])
+
+
+def _ideal_gas_ts_svg(process_type, s1, T1, s2, T2) -> str:
+    """T–s diagram of an ideal-gas process between two states."""
+    # Every process is drawn as a straight segment on T–s; an adiabatic one is
+    # pinned to s1 so rounding in s2 cannot tilt it.
+    s_end = s1 if process_type == "adiabatic" else s2
+    return render_ts_svg([s1, s_end], [T1, T2], [(s1, T1), (s2, T2)])
+
+
+def _render_ideal_gas_plots(process_type, exponent, state1, state2):
+    """
+    Saves (or reuses) the P–v and T–s diagrams for an ideal-gas process and
+    returns their URLs. States are (T, P, v, s) tuples; the curves are only
+    sampled when a diagram actually has to be drawn.
+    """
+    T1, P1, v1, s1 = state1
+    T2, P2, v2, s2 = state2
+    pv_img = _save_plot("pv", (process_type, exponent, v1, P1, v2, P2),
+                        lambda: _ideal_gas_pv_svg(process_type, exponent, v1, P1, v2, P2))
+    ts_img = _save_plot("ts", (process_type, s1, T1, s2, T2),
+                        lambda: _ideal_gas_ts_svg(process_type, s1, T1, s2, T2))
+    return pv_img, ts_img
+
+
+def _render_water_plots(process_type, state1, state2):
+    """
+    Saves (or reuses) the P–v and T–s diagrams for a water process, with the
+    saturation dome when both states are below the critical point, and returns
+    their URLs. States are (T, P, v, s) tuples.
+    """
+    T1, P1, v1, s1 = state1
+    T2, P2, v2, s2 = state2
+
+    # --- CREATE P-v DIAGRAM (640x480) ---
+    # Determine if we need saturation dome (if temperatures are in reasonable range)
+    show_saturation = max(T1, T2) < 374
+
+    dome_range = None
+    if show_saturation and (SEUIF97_AVAILABLE or _T_sorted.size):
+        # Saturation dome over the process range plus 5 °C either side,
+        # widened to whole degrees so nearby requests share a cached backdrop
+        dome_range = (math.floor(min(T1, T2) - 5), math.ceil(max(T1, T2) + 5))
+
+    # Process line (like ideal gas plots)
+    # For constant pressure process, make line thicker and more visible
+    linewidth = 3 if process_type == "Constant Pressure" else 2
+
+    # SMART SCALING for P-v diagram based on your specific data
+    v_min, v_max = min(v1, v2), max(v1, v2)
+    P_min, P_max = min(P1, P2), max(P1, P2)
+    pv_axes = {}
+
+    # For your specific case (tiny volume change at constant pressure)
+    if abs(v2 - v1) / v1 < 0.01:  # Less than 1% volume change
+        # Expand x-axis around the values
+        v_range = abs(v_max - v_min)
+        if v_range < 1e-9:  # Nearly identical volumes
+            v_padding = v1 * 0.1  # 10% padding
+        else:
+            v_padding = v_range * 5  # 5x the range as padding
+
+        pv_axes["xlim"] = (v_min - v_padding, v_max + v_padding)
+        logger.debug("P-v: Applied expanded linear scaling (tiny volume change)")
+
+        # For constant pressure, add small vertical range for visibility
+        if P1 == P2:
+            P_padding = P1 * 0.05  # 5% padding
+            pv_axes["ylim"] = (P_min - P_padding, P_max + P_padding)
+    else:
+        # For larger changes, use log scale if needed
+        if v_max / v_min > 10:
+            pv_axes["xlog"] = True
+            logger.debug("P-v: Applied log scale on x-axis")
+        if P_max / P_min > 10:
+            pv_axes["ylog"] = True
+            logger.debug("P-v: Applied log scale on y-axis")
+
+    pv_dome = None
+    if dome_range:
+        pv_dome = _dome_backdrop("pv", *dome_range, pv_axes.get("xlog", False), pv_axes.get("ylog", False))
+
+    # Legend always in top-right (like ideal gas plots)
+    pv_img = _save_plot("water_pv", (process_type, T1, T2, v1, P1, v2, P2), lambda: render_pv_svg(
+        [v1, v2], [P1, P2], [(v1, P1), (v2, P2)],
+        title=f"P–v Diagram: {process_type}", P_unit="bar", backdrop=pv_dome,
+        stroke="black", stroke_width=linewidth, label=f"{process_type} Process",
+        legend=True, **pv_axes))
+
+    # --- CREATE T-s DIAGRAM (640x480) ---
+    # SMART SCALING for T-s diagram
+    # For your data (0.03 to 0.31 kJ/kg·K entropy change)
+    s_min, s_max = min(s1, s2), max(s1, s2)
+    T_min, T_max = min(T1, T2), max(T1, T2)
+
+    # Add padding for better visibility
+    s_padding = (s_max - s_min) * 0.2
+    T_padding = (T_max - T_min) * 0.2
+
+    # Ensure minimum padding for very small ranges
+    s_padding = max(s_padding, 0.01)
+    T_padding = max(T_padding, 5)
+
+    logger.debug("T-s: Applied linear scaling with padding (s range: %.3f to %.3f)", s_min, s_max)
+
+    ts_dome = _dome_backdrop("ts", *dome_range) if dome_range else None
+
+    ts_img = _save_plot("water_ts", (process_type, s1, T1, s2, T2), lambda: render_ts_svg(
+        [s1, s2], [T1, T2], [(s1, T1), (s2, T2)],
+        title=f"T–s Diagram: {process_type}", T_unit="°C", backdrop=ts_dome,
+        stroke="black", stroke_width=linewidth, label=f"{process_type} Process",
+        xlim=(s_min - s_padding, s_max + s_padding),
+        ylim=(T_min - T_padding, T_max + T_padding),
+        legend=True))
+
+    return pv_img, ts_img
+
+
 @app.get("/get-results")
-def get_results():
+def get_results(plots: bool = True):
     """
     Returns results for both Ideal Gas and Water/Steam processes.
     Automatically detects which type and returns appropriate data.
+    With ?plots=false the diagrams are skipped and pv_img/ts_img are null.
     """
     try:
-        process_info = gas_data_store.get("process_info", {})
+        process_info = gas_data_store.process_info
         
-        if not process_info:
-            return JSONResponse({"error": "No simulation data found. Please run a simulation first."}, 
+        if process_info is None:
+            return ORJSONResponse({"error": "No simulation data found. Please run a simulation first."}, 
                               status_code=400)
         
-        gas_name = process_info.get("gas_name", "").lower()
+        gas_name = process_info.gas_name.lower()
         
-        print(f"📤 Fetching results for {gas_name}, process: {process_info.get('process')}")
+        logger.debug("Fetching results for %s, process: %s", gas_name, process_info.process)
         
         if gas_name == "water":
-            return get_water_results()
+            return get_water_results(plots)
         else:
             # IDEAL GAS CALCULATIONS
-            gas = gas_data_store.get("latest_submission", {})
+            gas = gas_data_store.latest
             
-            if not gas:
-                return JSONResponse({"error": "No gas data found."}, status_code=400)
+            if not isinstance(gas, IdealGasState):
+                return ORJSONResponse({"error": "No gas data found."}, status_code=400)
             
-            raw_process = process_info.get("process", "")
+            raw_process = process_info.process
             process_type = PROCESS_MAP.get(raw_process)
             
             if not process_type:
-                return JSONResponse({"error": f"Unknown process type: {raw_process}"}, 
+                return ORJSONResponse({"error": f"Unknown process type: {raw_process}"}, 
                                   status_code=400)
             
             # Get gas properties
-            cp, cv, R, k = gas["cp"], gas["cv"], gas["R"], gas["k"]
-            T1, P1, v1 = gas.get("T"), gas.get("P"), gas.get("v")
-            gas_name_display = gas["gas_name"]
+            cp, cv, R, k = gas.cp, gas.cv, gas.R, gas.k
+            T1, P1, v1 = gas.T, gas.P, gas.v
+            gas_name_display = gas.gas_name
             
             # Get process ratios
-            v_ratio = process_info.get("v_ratio", 1.0)
-            p_ratio = process_info.get("p_ratio", 1.0)
-            n = process_info.get("n_value")
+            v_ratio = process_info.v_ratio
+            p_ratio = process_info.p_ratio
+            n = process_info.n_value
             
-            # State 2 calculations
-            v2 = v1 * v_ratio
+            process_code = _PROCESS_CODES.get(process_type)
+            if process_code is None:
+                return ORJSONResponse({"error": "Unhandled process type."}, status_code=400)
             
-            if process_type == "isothermal":
-                P2 = P1 * (v1 / v2)
-                T2 = T1
-                exponent = 1.0
-            elif process_type == "polytropic":
-                exponent = n if n is not None else 1.0
-                P2 = P1 * (v1 / v2) ** exponent
-                T2 = T1 * (v1 / v2) ** (exponent - 1)
-            elif process_type == "adiabatic":
-                exponent = k
-                P2 = P1 * (v1 / v2) ** k
-                T2 = T1 * (v1 / v2) ** (k - 1)
-            elif process_type == "isochoric":
-                P2 = P1 * p_ratio
-                T2 = T1 * p_ratio
-                v2 = v1
-                exponent = np.inf
-            elif process_type == "isobaric":
-                T2 = T1 * v_ratio
-                P2 = P1
-                exponent = 0.0
-            else:
-                return JSONResponse({"error": "Unhandled process type."}, status_code=400)
-            
-            # Energy calculations
-            u1, u2 = cv * T1, cv * T2
-            h1, h2 = cp * T1, cp * T2
-            delta_u, delta_h = u2 - u1, h2 - h1
-            
-            # Work calculation
-            if process_type == "isochoric":
-                W = 0
-            elif process_type == "isobaric":
-                W = P1 * (v2 - v1)
-            elif process_type == "isothermal":
-                W = R * T1 * np.log(v2 / v1)
-            elif process_type in ("polytropic", "adiabatic"):
-                if np.isclose(exponent, 1.0):
-                    W = R * T1 * np.log(v2 / v1)
-                else:
-                    W = (P2 * v2 - P1 * v1) / (1 - exponent)
-            
-            # Heat and entropy
-            Q = delta_u + W
-            delta_s = cp * np.log(T2 / T1) - R * np.log(P2 / P1)
-            s1 = cp * np.log(T1) - R * np.log(P1)
-            s2 = s1 + delta_s
-            
-            # Generate P-v plot
-            if v1 == v2:
-                v_vals = np.full(100, v1)
-            else:
-                v_vals = np.linspace(min(v1, v2), max(v1, v2), 100)
+            # Isochoric processes are driven by p_ratio, all others by v_ratio
+            ratio_name = "p_ratio" if process_type == "isochoric" else "v_ratio"
+            if (p_ratio if ratio_name == "p_ratio" else v_ratio) is None:
+                return ORJSONResponse({"error": f"Missing {ratio_name} for {process_type} process."},
+                                      status_code=400)
+            if process_type == "polytropic" and n is None:
+                return ORJSONResponse({"error": "Missing n_value for polytropic process."},
+                                      status_code=400)
             
-            if process_type == "isochoric":
-                v_vals = np.full(100, v1)
-                P_vals = np.linspace(P1, P2, 100)
-            elif process_type == "isobaric":
-                P_vals = np.full(100, P1)
-            elif process_type == "isothermal":
-                P_vals = P1 * v1 / v_vals
-            elif process_type == "adiabatic":
-                P_vals = P1 * (v1 / v_vals) ** k
-            elif process_type == "polytropic":
-                P_vals = P1 * (v1 / v_vals) ** n
+            # State 2, energy and entropy in one compiled call. Inputs the process
+            # does not use are passed as NaN (or n=1) so the arguments stay all float.
+            T2, P2, v2, u1, u2, h1, h2, W, Q, s1, s2, exponent = _solve_ideal_gas_process(
+                process_code, float(T1), float(P1), float(v1),
+                float(v_ratio) if ratio_name == "v_ratio" else math.nan,
+                float(p_ratio) if ratio_name == "p_ratio" else math.nan,
+                float(k), float(cv), float(cp), float(R),
+                float(n) if process_type == "polytropic" else 1.0)
+            delta_u, delta_h, delta_s = u2 - u1, h2 - h1, s2 - s1
             
-            if v1 > v2 and v1 != v2:
-                v_vals = v_vals[::-1]
-                P_vals = P_vals[::-1]
+            pv_img = ts_img = None
+            if plots:
+                pv_img, ts_img = _render_ideal_gas_plots(process_type, exponent,
+                                                         (T1, P1, v1, s1), (T2, P2, v2, s2))
             
-            pv_plot_file = images_path / "pv_diagram.png"
-            plt.figure()
-            plt.plot(v_vals, P_vals, linewidth=2)
-            plt.scatter([v1, v2], [P1, P2], color='red')
-            plt.xlabel("v (m³/kg)")
-            plt.ylabel("P (kPa)")
-            plt.title("P–v Diagram")
-            plt.grid(True)
-            plt.savefig(pv_plot_file)
-            plt.close()
-            
-            # Generate T-s plot
-            if process_type == "isothermal":
-                T_vals = np.full(100, T1)
-                s_vals = np.linspace(s1, s2, 100)
-            elif process_type == "adiabatic":
-                s_vals = np.full(100, s1)
-                T_vals = np.linspace(T1, T2, 100)
-            else:
-                T_vals = np.linspace(T1, T2, 100)
-                s_vals = np.linspace(s1, s2, 100)
-            
-            if T1 > T2 and T1 != T2:
-                T_vals = T_vals[::-1]
-                s_vals = s_vals[::-1]
-            
-            ts_plot_file = images_path / "ts_diagram.png"
-            plt.figure()
-            plt.plot(s_vals, T_vals, linewidth=2)
-            plt.scatter([s1, s2], [T1, T2], color='red')
-            plt.xlabel("s (kJ/kg·K)")
-            plt.ylabel("T (K)")
-            plt.title("T–s Diagram")
-            plt.grid(True)
-            plt.savefig(ts_plot_file)
-            plt.close()
-            
-            return {
+            return ORJSONResponse({
                 "gas_name": gas_name_display,
                 "process_type": process_type,
                 "state1": {
-                    "T": round(T1, 5),
-                    "P": round(P1, 5),
-                    "v": round(v1, 5),
-                    "u": round(u1, 5),
-                    "h": round(h1, 5),
-                    "s": round(s1, 5)
+                    "T": T1,
+                    "P": P1,
+                    "v": v1,
+                    "u": u1,
+                    "h": h1,
+                    "s": s1
                 },
                 "state2": {
-                    "T": round(T2, 5),
-                    "P": round(P2, 5),
-                    "v": round(v2, 5),
-                    "u": round(u2, 5),
-                    "h": round(h2, 5),
-                    "s": round(s2, 5)
+                    "T": T2,
+                    "P": P2,
+                    "v": v2,
+                    "u": u2,
+                    "h": h2,
+                    "s": s2
                 },
                 "processed": {
-                    "W": round(W, 5),
-                    "Q": round(Q, 5),
-                    "delta_u": round(delta_u, 5),
-                    "delta_h": round(delta_h, 5),
-                    "delta_s": round(delta_s, 5)
+                    "W": W,
+                    "Q": Q,
+                    "delta_u": delta_u,
+                    "delta_h": delta_h,
+                    "delta_s": delta_s
                 },
-                "pv_img": f"/static/images/pv_diagram.png",
-                "ts_img": f"/static/images/ts_diagram.png"
-            }
+                "pv_img": pv_img,
+                "ts_img": ts_img
+            })
             
     except Exception as e:
-        print(f"❌ Error in get-results: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return JSONResponse({"error": f"Failed to get results: {str(e)}"}, status_code=500)
+        logger.exception("Error in get-results")
+        return ORJSONResponse({"error": f"Failed to get results: {str(e)}"}, status_code=500)
 
 # -------------------------
 #   NEW WATER RESULTS ROUTE
 # -------------------------
 @app.get("/get-water-results")
-def get_water_results():
+def get_water_results(plots: bool = True):
     """
     Returns Water/Steam process results with plots in same format as ideal gas.
+    With ?plots=false the diagrams are skipped and pv_img/ts_img are null.
     """
     try:
-        process_info = gas_data_store.get("process_info", {})
+        process_info = gas_data_store.process_info
         
-        if not process_info:
-            return JSONResponse({"error": "No water process data available. Run simulation first."}, 
+        if process_info is None:
+            return ORJSONResponse({"error": "No water process data available. Run simulation first."}, 
                               status_code=400)
+        if not isinstance(process_info, WaterProcessInfo):
+            return ORJSONResponse({"error": "Incomplete state data."}, status_code=400)
         
-        # Get State 1 and State 2 data
-        state1 = process_info.get("state1", {})
-        state2 = process_info.get("state2", {})
-        
-        if not state1 or not state2:
-            return JSONResponse({"error": "Incomplete state data."}, status_code=400)
-        
-        # Extract all properties
-        T1 = float(state1.get("T", 0))
-        P1 = float(state1.get("P", 0))
-        v1 = float(state1.get("v", 0))
-        u1 = float(state1.get("u", 0))
-        h1 = float(state1.get("h", 0))
-        s1 = float(state1.get("s", 0))
-        x1 = float(state1.get("x", 0))
+        # Both states come out of the stored record array as plain floats in one call
+        (T1, P1, v1, u1, h1, s1, x1), (T2, P2, v2, u2, h2, s2, x2) = process_info.states.tolist()
         
-        T2 = float(state2.get("T", 0))
-        P2 = float(state2.get("P", 0))
-        v2 = float(state2.get("v", 0))
-        u2 = float(state2.get("u", 0))
-        h2 = float(state2.get("h", 0))
-        s2 = float(state2.get("s", 0))
-        x2 = float(state2.get("x", 0))
+        process_type = process_info.process
         
-        process_type = process_info.get("process", "Unknown")
-        
-        print(f"📊 Water Results Calculation:")
-        print(f"   Process: {process_type}")
-        print(f"   State 1: T={T1}°C, P={P1}bar, v={v1}m³/kg, u={u1}, h={h1}, s={s1}, x={x1}")
-        print(f"   State 2: T={T2}°C, P={P2}bar, v={v2}m³/kg, u={u2}, h={h2}, s={s2}, x={x2}")
+        logger.debug("Water results for %s: State 1: T=%s°C, P=%sbar, v=%sm³/kg, u=%s, h=%s, s=%s, x=%s; "
+                     "State 2: T=%s°C, P=%sbar, v=%sm³/kg, u=%s, h=%s, s=%s, x=%s", process_type,
+                     T1, P1, v1, u1, h1, s1, x1, T2, P2, v2, u2, h2, s2, x2)
         
         # --- PROCESS CALCULATIONS ---
         delta_u = u2 - u1
@@ -1072,178 +1753,23 @@ def get_water_results():
         # Heat calculation using First Law
         Q = delta_u + W
         
-        print(f"   Calculated: Δu={delta_u:.2f}, Δh={delta_h:.2f}, Δs={delta_s:.4f}")
-        print(f"   Work (W) = {W:.2f} kJ/kg, Heat (Q) = {Q:.2f} kJ/kg")
+        logger.debug("Calculated: Δu=%.2f, Δh=%.2f, Δs=%.4f, W=%.2f kJ/kg, Q=%.2f kJ/kg",
+                     delta_u, delta_h, delta_s, W, Q)
         
         # --- SMART SCALING ANALYSIS ---
-        print(f"   Scaling analysis:")
-        print(f"     v1={v1:.6f}, v2={v2:.6f}, ratio={max(v1, v2)/min(v1, v2):.6f}")
-        print(f"     P1={P1:.3f}, P2={P2:.3f}, ratio={max(P1, P2)/min(P1, P2):.6f}")
-        print(f"     Δv={abs(v2-v1):.8f}, % change={abs(v2-v1)/v1*100:.6f}%")
-        
-        # --- CREATE P-v DIAGRAM (640x480) ---
-        water_pv_plot_file = images_path / "water_pv_diagram.png"
-        
-        # Set figure size to 640x480 pixels at 100 DPI
-        plt.figure(figsize=(6.4, 4.8), dpi=100)
-        
-        # Determine if we need saturation dome (if temperatures are in reasonable range)
-        show_saturation = (T1 < 374 and T2 < 374) and (min(T1, T2) < 374)
-        
-        if show_saturation:
-            # Plot saturation dome (if within range)
-            T_min = min(T1, T2)
-            T_max = max(T1, T2)
-            T_range = np.linspace(max(0.01, T_min-5), min(374, T_max+5), 50)
-            P_sat_vals = []
-            vf_vals = []
-            vg_vals = []
-            
-            for T in T_range:
-                Psat, _ = get_psat(T)
-                if Psat:
-                    P_sat_vals.append(Psat)
-                    vf = interpolate_water_property_by_T(T, "vf")
-                    vg = interpolate_water_property_by_T(T, "vg")
-                    vf_vals.append(vf)
-                    vg_vals.append(vg)
-            
-            # Only plot if we have valid data
-            if P_sat_vals and vf_vals and vg_vals:
-                plt.plot(vf_vals, P_sat_vals, 'b-', alpha=0.5, linewidth=1, label='Saturated Liquid')
-                plt.plot(vg_vals, P_sat_vals, 'r-', alpha=0.5, linewidth=1, label='Saturated Vapor')
+        # The ratios are computed for the log line only, so skip them unless it is shown
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Scaling analysis: v1=%.6f, v2=%.6f, ratio=%.6f; P1=%.3f, P2=%.3f, ratio=%.6f; "
+                         "Δv=%.8f, %% change=%.6f%%",
+                         v1, v2, max(v1, v2)/min(v1, v2), P1, P2, max(P1, P2)/min(P1, P2),
+                         abs(v2-v1), abs(v2-v1)/v1*100)
         
-        # Plot process line (like ideal gas plots)
-        # For constant pressure process, make line thicker and more visible
-        linewidth = 3 if process_type == "Constant Pressure" else 2
-        plt.plot([v1, v2], [P1, P2], 'k-', linewidth=linewidth, label=f'{process_type} Process')
-        plt.scatter([v1, v2], [P1, P2], color='red', s=80, zorder=5)
+        pv_img = ts_img = None
+        if plots:
+            pv_img, ts_img = _render_water_plots(process_type, (T1, P1, v1, s1), (T2, P2, v2, s2))
+            logger.debug("Generated plots: %s, %s", pv_img, ts_img)
         
-        # Add labels for states with offset to avoid overlap
-        offset_x1 = (v2 - v1) * 0.3 if v2 != v1 else v1 * 0.01
-        offset_x2 = (v1 - v2) * 0.3 if v1 != v2 else v2 * 0.01
-        
-        # plt.text(v1 + offset_x1, P1, ' State 1', verticalalignment='bottom', 
-        #         fontsize=9, bbox=dict(boxstyle="round,pad=0.3", facecolor="white", alpha=0.8))
-        # plt.text(v2 + offset_x2, P2, ' State 2', verticalalignment='bottom', 
-        #         fontsize=9, bbox=dict(boxstyle="round,pad=0.3", facecolor="white", alpha=0.8))
-        
-        plt.xlabel("v (m³/kg)", fontsize=11)
-        plt.ylabel("P (bar)", fontsize=11)
-        plt.title(f"P–v Diagram: {process_type}", fontsize=12)
-        plt.grid(True, alpha=0.3)
-        
-        # SMART SCALING for P-v diagram based on your specific data
-        v_min, v_max = min(v1, v2), max(v1, v2)
-        P_min, P_max = min(P1, P2), max(P1, P2)
-        
-        # For your specific case (tiny volume change at constant pressure)
-        if abs(v2 - v1) / v1 < 0.01:  # Less than 1% volume change
-            # Expand x-axis around the values
-            v_range = abs(v_max - v_min)
-            if v_range < 1e-9:  # Nearly identical volumes
-                v_padding = v1 * 0.1  # 10% padding
-            else:
-                v_padding = v_range * 5  # 5x the range as padding
-            
-            plt.xlim([v_min - v_padding, v_max + v_padding])
-            print(f"   P-v: Applied expanded linear scaling (tiny volume change)")
-            
-            # For constant pressure, add small vertical range for visibility
-            if P1 == P2:
-                P_padding = P1 * 0.05  # 5% padding
-                plt.ylim([P_min - P_padding, P_max + P_padding])
-        else:
-            # For larger changes, use log scale if needed
-            if v_max / v_min > 10:
-                plt.xscale('log')
-                print(f"   P-v: Applied log scale on x-axis")
-            if P_max / P_min > 10:
-                plt.yscale('log')
-                print(f"   P-v: Applied log scale on y-axis")
-        
-        # Legend always in top-right (like ideal gas plots)
-        if show_saturation and P_sat_vals and vf_vals and vg_vals:
-            plt.legend(loc='upper right')
-        else:
-            plt.legend(loc='upper right')
-        
-        plt.tight_layout()
-        plt.savefig(water_pv_plot_file, bbox_inches='tight')
-        plt.close()
-        
-        # --- CREATE T-s DIAGRAM (640x480) ---
-        water_ts_plot_file = images_path / "water_ts_diagram.png"
-        
-        # Set figure size to 640x480 pixels at 100 DPI
-        plt.figure(figsize=(6.4, 4.8), dpi=100)
-        
-        # Plot saturation dome if relevant
-        if show_saturation and P_sat_vals:
-            sf_vals = [interpolate_water_property_by_T(T, "sf") for T in T_range]
-            sg_vals = [interpolate_water_property_by_T(T, "sg") for T in T_range]
-            
-            valid_indices = [i for i, (sf, sg) in enumerate(zip(sf_vals, sg_vals)) 
-                           if sf is not None and sg is not None]
-            
-            if valid_indices:
-                T_range_valid = [T_range[i] for i in valid_indices]
-                sf_valid = [sf_vals[i] for i in valid_indices]
-                sg_valid = [sg_vals[i] for i in valid_indices]
-                
-                plt.plot(sf_valid, T_range_valid, 'b-', alpha=0.5, linewidth=1, label='Saturated Liquid')
-                plt.plot(sg_valid, T_range_valid, 'r-', alpha=0.5, linewidth=1, label='Saturated Vapor')
-        
-        # Plot process line (like ideal gas plots)
-        linewidth = 3 if process_type == "Constant Pressure" else 2
-        plt.plot([s1, s2], [T1, T2], 'k-', linewidth=linewidth, label=f'{process_type} Process')
-        plt.scatter([s1, s2], [T1, T2], color='red', s=80, zorder=5)
-        
-        # Add labels for states
-        offset_s1 = (s2 - s1) * 0.3 if s2 != s1 else 0.01
-        offset_s2 = (s1 - s2) * 0.3 if s1 != s2 else 0.01
-        
-        # plt.text(s1 + offset_s1, T1, ' State 1', verticalalignment='bottom', 
-        #         fontsize=9, bbox=dict(boxstyle="round,pad=0.3", facecolor="white", alpha=0.8))
-        # plt.text(s2 + offset_s2, T2, ' State 2', verticalalignment='bottom', 
-        #         fontsize=9, bbox=dict(boxstyle="round,pad=0.3", facecolor="white", alpha=0.8))
-        
-        plt.xlabel("s (kJ/kg·K)", fontsize=11)
-        plt.ylabel("T (°C)", fontsize=11)
-        plt.title(f"T–s Diagram: {process_type}", fontsize=12)
-        plt.grid(True, alpha=0.3)
-        
-        # SMART SCALING for T-s diagram
-        # For your data (0.03 to 0.31 kJ/kg·K entropy change)
-        s_min, s_max = min(s1, s2), max(s1, s2)
-        T_min, T_max = min(T1, T2), max(T1, T2)
-        
-        # Add padding for better visibility
-        s_padding = (s_max - s_min) * 0.2
-        T_padding = (T_max - T_min) * 0.2
-        
-        # Ensure minimum padding for very small ranges
-        s_padding = max(s_padding, 0.01)
-        T_padding = max(T_padding, 5)
-        
-        plt.xlim([s_min - s_padding, s_max + s_padding])
-        plt.ylim([T_min - T_padding, T_max + T_padding])
-        
-        print(f"   T-s: Applied linear scaling with padding (s range: {s_min:.3f} to {s_max:.3f})")
-        
-        # Legend always in top-right (like ideal gas plots)
-        if show_saturation and valid_indices:
-            plt.legend(loc='upper right')
-        else:
-            plt.legend(loc='upper right')
-        
-        plt.tight_layout()
-        plt.savefig(water_ts_plot_file, bbox_inches='tight')
-        plt.close()
-        
-        print(f"✅ Generated plots: {water_pv_plot_file}, {water_ts_plot_file}")
-        
-        return {
+        return ORJSONResponse({
             "gas_name": "water",
             "process_type": process_type,
             "state1": {
@@ -1271,27 +1797,25 @@ def get_water_results():
                 "delta_h": round(delta_h, 3),
                 "delta_s": round(delta_s, 5)
             },
-            "pv_img": f"/static/images/water_pv_diagram.png?t={int(time.time())}",
-            "ts_img": f"/static/images/water_ts_diagram.png?t={int(time.time())}"
-        }
+            "pv_img": pv_img,
+            "ts_img": ts_img
+        })
         
     except Exception as e:
-        print(f"❌ Error in get-water-results: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return JSONResponse({"error": f"Failed to get water results: {str(e)}"}, status_code=500)
+        logger.exception("Error in get-water-results")
+        return ORJSONResponse({"error": f"Failed to get water results: {str(e)}"}, status_code=500)
 
 
 @app.get("/debug-state1")
 def debug_state1():
     """Check what's in State 1 storage"""
-    state1 = gas_data_store.get("latest_submission", {})
-    return {
-        "has_data": bool(state1),
-        "gas_name": state1.get("gas_name"),
-        "P_original": state1.get("P_original"),
-        "P": state1.get("P"),
-        "T_original": state1.get("T_original"),
-        "T": state1.get("T"),
-        "all_data": state1
-    }
\ No newline at end of file
+    state1 = gas_data_store.latest
+    return ORJSONResponse({
+        "has_data": state1 is not None,
+        "gas_name": getattr(state1, "gas_name", None),
+        "P_original": getattr(state1, "P_original", None),
+        "P": getattr(state1, "P", None),
+        "T_original": getattr(state1, "T_original", None),
+        "T": getattr(state1, "T", None),
+        "all_data": asdict(state1) if state1 else {}
+    })
\ No newline at end of file